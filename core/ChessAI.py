@@ -1,4 +1,7 @@
 import random
+import numpy as np
+from core import ChessEngine
+from core.ChessKernels import scorePieces
 
 
 class ChessAI:
@@ -96,6 +99,12 @@ class ChessAI:
                                     "wK": self.whiteKingScores,
                                     "bK": self.blackKingScores
                                     }
+        # signed material and position scores by bitboard index, so scoring runs in one compiled pass
+        signs = [1 if name[0] == 'w' else -1 for name in ChessEngine.PIECE_NAMES]
+        self.materialTable = np.array([sign * self.pieceScore[name[1]]
+                                       for sign, name in zip(signs, ChessEngine.PIECE_NAMES)], dtype=np.int64)
+        self.positionTable = np.array([np.ravel(self.piecePositionScores[name if name[1] in "PK" else name[1]]) * sign
+                                       for sign, name in zip(signs, ChessEngine.PIECE_NAMES)], dtype=np.float64)
         self.CHECKMATE = 1000
         self.STALEMATE = 0
         self.DEPTH = depth
@@ -106,12 +115,6 @@ class ChessAI:
 
     @staticmethod
     def playPGNMove(validMoves, i, first_game):
-        ranksToRows = {"1": 7, "2": 6, "3": 5, "4": 4,
-                       "5": 3, "6": 2, "7": 1, "8": 0}
-
-        filesToCols = {"a": 0, "b": 1, "c": 2, "d": 3,
-                       "e": 4, "f": 5, "g": 6, "h": 7}
-
         board = first_game.board()
         k = 0
         for move in first_game.mainline_moves():
@@ -119,9 +122,10 @@ class ChessAI:
             moveStr = str(move)
             k = k + 1
             if k == i:
+                startSq = ChessEngine.squareIndex(moveStr[0:2])
+                endSq = ChessEngine.squareIndex(moveStr[2:4])
                 for playerMove in validMoves:
-                    if playerMove.startRow == ranksToRows[moveStr[1]] and playerMove.startCol == filesToCols[moveStr[0]] \
-                            and playerMove.endRow == ranksToRows[moveStr[3]] and playerMove.endCol == filesToCols[moveStr[2]]:
+                    if playerMove & 63 == startSq and playerMove >> 6 & 63 == endSq:
                         return playerMove
 
     def findBestMove(self, gs, validMoves):
@@ -249,21 +253,7 @@ class ChessAI:
         elif gs.staleMate:
             return self.STALEMATE
 
-        score = 0
-        for row in range(len(gs.board)):
-            for col in range(len(gs.board[row])):
-                square = gs.board[row][col]
-                if square != "--":
-                    piecePositionScore = 0
-                    if square[1] == "P" or square[1] == "K":
-                        piecePositionScore = self.piecePositionScores[square][row][col]
-                    else:
-                        piecePositionScore = self.piecePositionScores[square[1]][row][col]
-
-                    if square[0] == 'w':
-                        score += self.pieceScore[square[1]] + piecePositionScore * .1
-                    elif square[0] == 'b':
-                        score -= self.pieceScore[square[1]] + piecePositionScore * .1
+        score = scorePieces(gs.bb, self.materialTable, self.positionTable)
 
         if gs.whiteCastled:
             score += 1
@@ -12,7 +12,6 @@ class ChessController():
         self.chessModel = ChessEngine.GameState()
 
     def animateMove(self, move, clock):
-        colors = [p.Color(235, 235, 208), p.Color(119, 148, 85)]
         dR = move.endRow - move.startRow
         dC = move.endCol - move.startCol
         framesPerSquare = 5
@@ -21,9 +20,8 @@ class ChessController():
             row, col = (move.startRow + dR*frame/frameCount, move.startCol + dC*frame/frameCount)
             self.chessView.drawBoard()
             self.chessView.drawPieces(self.chessModel.board)
-            color = colors[(move.endRow + move.endCol) % 2]
-            endSquare = p.Rect(move.endCol * self.chessView.SQUARE_SIZE, move.endRow * self.chessView.SQUARE_SIZE, self.chessView.SQUARE_SIZE, self.chessView.SQUARE_SIZE)
-            p.draw.rect(self.chessView.screen, color, endSquare)
+            endSquare = self.chessView.SQUARE_RECTS[move.endRow * 8 + move.endCol]
+            p.draw.rect(self.chessView.screen, self.chessView.SQUARE_COLORS[move.endRow * 8 + move.endCol], endSquare)
             if move.pieceCaptured != "--":
                 if move.isEnpassantMove:
                     enPassantRow = move.endRow + 1 if move.pieceCaptured[0] == "b" else move.endRow -1
@@ -36,13 +34,13 @@ class ChessController():
     def highlightSquares(self, selected):
         if selected != ():
             row, col = selected
-            if self.chessModel.board[row][col][0] == ("w" if self.chessModel.whiteMoves else "b"):
+            if self.chessModel.board[row, col][0] == ("w" if self.chessModel.whiteMoves else "b"):
                 s = p.Surface((self.chessView.SQUARE_SIZE, self.chessView.SQUARE_SIZE))
                 s.set_alpha(100)
                 s.fill(p.Color("blue"))
                 self.chessView.screen.blit(s, (col * self.chessView.SQUARE_SIZE, row * self.chessView.SQUARE_SIZE))
                 s.fill(p.Color("yellow"))
-                for move in self.chessModel.getValidMoves():
+                for move in map(ChessEngine.unpackMove, self.chessModel.getValidMoves()):
                     if move.startRow == row and move.startCol == col:
                         self.chessView.screen.blit(s, (move.endCol * self.chessView.SQUARE_SIZE, move.endRow * self.chessView.SQUARE_SIZE))
 
@@ -131,6 +129,8 @@ class ChessController():
         view = self.chessView
         view.screen = p.display.set_mode((view.WIDTH + view.MOVE_LOG_WIDTH, view.HEIGHT))
         validMoves = gs.getValidMoves()
+        # packed ids of the legal moves, so a click is one set lookup
+        validKeys = set(validMoves)
         moveMade = False
         p.display.set_caption(windowText)
         gameOver = False
@@ -163,13 +163,19 @@ class ChessController():
             chessPub.register(chessSub)
         turn = 1
         play = 0
+        # the screen only changes after a click, a key or a move, or when the window has to be repainted,
+        # so other events skip the redraw and flip
+        redraw = True
         while running:
             humanTurn = (gs.whiteMoves and playerOne) or (not gs.whiteMoves and playerTwo)
             for e in p.event.get():
                 if e.type == p.QUIT:
                     running = False
                     p.quit()
+                elif e.type in (p.VIDEOEXPOSE, p.WINDOWEXPOSED, p.WINDOWRESTORED, p.WINDOWFOCUSGAINED):
+                    redraw = True
                 elif e.type == p.MOUSEBUTTONDOWN:
+                    redraw = True
                     if not gameOver and humanTurn:
                         location = p.mouse.get_pos()
                         col = location[0] // view.SQUARE_SIZE
@@ -182,19 +188,19 @@ class ChessController():
                             clicked.append(selected)
                         if len(clicked) == 2:  # daca lista are 2 elemente atunci se face mutarea
                             move = ChessEngine.Move(clicked[0], clicked[1], gs.board)
-                            for i in range(len(validMoves)):
-                                if move == validMoves[i]:
-                                    gs.makeMove(validMoves[i])
-                                    moveMade = True
-                                    moveSound = p.mixer.Sound(r"../images/ChessMoveSound.mp3")
-                                    moveSound.play()
-                                    animate = True
-                                    selected = ()
-                                    clicked = []
+                            if move.moveID in validKeys:
+                                gs.makeMove(move.moveID)
+                                moveMade = True
+                                moveSound = p.mixer.Sound(r"../images/ChessMoveSound.mp3")
+                                moveSound.play()
+                                animate = True
+                                selected = ()
+                                clicked = []
                             if not moveMade:
                                 clicked = [selected]
 
                 elif e.type == p.KEYDOWN:
+                    redraw = True
                     if e.key == p.K_z:
                         if (len(gs.moveHistory) > 0):
                             gs.undoMove()
@@ -209,6 +215,7 @@ class ChessController():
                     if e.key == p.K_r:
                         gs = ChessEngine.GameState()
                         validMoves = gs.getValidMoves()
+                        validKeys = set(validMoves)
                         selected = ()
                         clicked = []
                         moveMade = False
@@ -256,6 +263,7 @@ class ChessController():
                         moveSound.play()
 
                         moveMade = True
+                        redraw = True
 
                         if not gameOver:
                             animate = True
@@ -299,6 +307,7 @@ class ChessController():
                         self.animateMove(gs.moveHistory[-1], clock)
 
                     validMoves = gs.getValidMoves()
+                    validKeys = set(validMoves)
                     moveMade = False
                     animate = False
                     if gs.whiteMoves and len(gs.moveHistory) >= 1:
@@ -309,7 +318,8 @@ class ChessController():
                         whiteChecked = ""
                         blackChecked = ""
 
-                self.drawGameState(selected, AI, chessPub)
+                if redraw:
+                    self.drawGameState(selected, AI, chessPub)
 
                 if gs.checkMate and resigned == False:
                     gameOver = True
@@ -369,7 +379,9 @@ class ChessController():
                         play = 1
                         
                 clock.tick(view.FPS)
-                p.display.flip()
+                if redraw:
+                    p.display.flip()
+                    redraw = False
 
     def playGame(self, language, subscribed):
         self.chessView.mainMenu(language, subscribed)
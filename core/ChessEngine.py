@@ -1,113 +1,199 @@
 import os
 import pygame as p
 import numpy as np
+from core.ChessKernels import (ALL, BLACK, FLAG_CASTLE, FLAG_ENPASSANT, FLAG_PROMOTION, KING, NO_PIECE, PAWN, QUIETS,
+                               WHITE, ZOB_CASTLE, ZOB_EP_FILE, ZOB_PIECE, ZOB_SIDE, attackedSquares, genAllMoves,
+                               pieceCodes, squareAttacked, toggleBoards)
+
+
+# piece names by bitboard index (color * 6 + kind)
+PIECE_NAMES = ("wP", "wN", "wB", "wR", "wQ", "wK",
+               "bP", "bN", "bB", "bR", "bQ", "bK")
+PIECE_INDEX = {name: i for i, name in enumerate(PIECE_NAMES)}
+# castle rights are one int of these bits; a move from or to a square keeps CASTLE_CLEAR[square] of them
+CASTLE_WK, CASTLE_WQ, CASTLE_BK, CASTLE_BQ = 1, 2, 4, 8
+CASTLE_ALL = CASTLE_WK | CASTLE_WQ | CASTLE_BK | CASTLE_BQ
+KINGSIDE_RIGHT = (CASTLE_WK, CASTLE_BK)
+QUEENSIDE_RIGHT = (CASTLE_WQ, CASTLE_BQ)
+CASTLE_CLEAR = tuple(CASTLE_ALL & ~{0: CASTLE_BQ, 4: CASTLE_BK | CASTLE_BQ, 7: CASTLE_BK,
+                                    56: CASTLE_WQ, 60: CASTLE_WK | CASTLE_WQ, 63: CASTLE_WK}.get(sq, 0)
+                     for sq in range(64))
+
+# mailbox codes: 0 is an empty square, otherwise the piece's bitboard index + 1
+CODE_TO_STR = np.array(("--",) + PIECE_NAMES)
+# files by column and ranks by row; the algebraic name of every square is indexed by row * 8 + col (a8 = 0)
+FILES = "abcdefgh"
+RANKS = "87654321"
+SQUARE_NAMES = tuple(file + rank for rank in RANKS for file in FILES)
+
+# the starting position as one bitboard per piece (a8 = bit 0), and the occupancy of each colour
+STARTPOS_BB = np.array([
+    0x00FF000000000000, 0x4200000000000000, 0x2400000000000000,  # wP, wN, wB
+    0x8100000000000000, 0x0800000000000000, 0x1000000000000000,  # wR, wQ, wK
+    0x000000000000FF00, 0x0000000000000042, 0x0000000000000024,  # bP, bN, bB
+    0x0000000000000081, 0x0000000000000008, 0x0000000000000010,  # bR, bQ, bK
+], dtype=np.uint64)
+STARTPOS_OCC = np.array([0xFFFF000000000000, 0x000000000000FFFF], dtype=np.uint64)
+
+MAX_MOVES = 256
+# initial depth of the move stacks; they double whenever a game or search goes deeper
+MAX_PLY = 1024
+# slots of the legal move cache, a power of two so a key's slot is its low bits
+MOVE_CACHE_SIZE = 1 << 16
+# A move stack entry is one int: move | castle rights << 32 | (en passant square + 1) << 36, i.e.
+# the move and the state it cleared, so undoMove restores everything from a single read.
+MOVE_MASK = (1 << 32) - 1
 
 
 class GameState:
     def __init__(self):
-        self.board = np.array([["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"],
-                      ["bP", "bP", "bP", "bP", "bP", "bP", "bP", "bP"],
-                      ["--", "--", "--", "--", "--", "--", "--", "--"],
-                      ["--", "--", "--", "--", "--", "--", "--", "--"],
-                      ["--", "--", "--", "--", "--", "--", "--", "--"],
-                      ["--", "--", "--", "--", "--", "--", "--", "--"],
-                      ["wP", "wP", "wP", "wP", "wP", "wP", "wP", "wP"],
-                      ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"]])
-        self.whiteMoves = True
-        self.moveHistory = []
-        self.moveFunctions = {'P': self.getPawnMoves, 'R': self.getRookMoves,
-                              'N': self.getKnightMoves, 'B': self.getBishopMoves,
-                              'Q': self.getQueenMoves, 'K': self.getKingMoves}
+        # one bitboard per piece, square index = row * 8 + col (a8 = 0, h1 = 63)
+        self.bb = STARTPOS_BB.copy()
+        # occupancy of each colour, indexed like side, so the enemy's is always occ[side ^ 1]
+        self.occ = STARTPOS_OCC.copy()
+        self._board = None
+        self._attacked = None
+        self.side = WHITE
+        self.moveStack = np.empty(MAX_PLY, dtype=np.int64)
+        self.keyStack = np.empty(MAX_PLY, dtype=np.uint64)
+        self.ply = 0
+        self._history = []
+        self.moveBuffer = np.empty(MAX_MOVES, dtype=np.int32)
+        # one list per ply, including the position after the deepest stack entry
+        self.moveLists = [[] for _ in range(MAX_PLY + 1)]
+        self.moveCache = [None] * MOVE_CACHE_SIZE
         self.whiteKingLocation = (7, 4)
         self.blackKingLocation = (0, 4)
         self.checkMate = False
         self.staleMate = False
         self.enpassantPossible = ()
-        self.enpassantPossibleLog = [self.enpassantPossible]
-        self.currentCastlingRight = CastleRights(True, True, True, True)
-        self.castleRightsHistory = [CastleRights(self.currentCastlingRight.wks,
-                                                 self.currentCastlingRight.bks,
-                                                 self.currentCastlingRight.wqs,
-                                                 self.currentCastlingRight.bqs)]
+        self.castleRights = CASTLE_ALL
         self.whiteCastled = False
         self.blackCastled = False
         self.play = 0
+        self.key = self.zobristKey()
+
+    def zobristKey(self):
+        # the full hash of the position; makeMove and undoMove keep self.key up to date incrementally
+        key = 0
+        for i in range(12):
+            bb = int(self.bb[i])
+            while bb:
+                key ^= int(ZOB_PIECE[i, (bb & -bb).bit_length() - 1])
+                bb &= bb - 1
+        if self.side == BLACK:
+            key ^= ZOB_SIDE
+        return key ^ self.stateKey()
+
+    def stateKey(self):
+        # the part of the hash for castle rights and the en passant file
+        key = ZOB_CASTLE[self.castleRights]
+        if self.enpassantPossible:
+            key ^= ZOB_EP_FILE[self.enpassantPossible[1]]
+        return key
+
+    @property
+    def whiteMoves(self):
+        return self.side == WHITE
+
+    @whiteMoves.setter
+    def whiteMoves(self, whiteMoves):
+        self.side = WHITE if whiteMoves else BLACK
+
+    @property
+    def board(self):
+        # the string board is only used for rendering, so it is rebuilt lazily from a uint8 mailbox of
+        # the bitboards; the strings only appear in the final lookup
+        if self._board is None:
+            self._board = CODE_TO_STR[pieceCodes(self.bb)].reshape(8, 8)
+        return self._board
+
+    @property
+    def moveHistory(self):
+        # Move views of the stack rows for the UI. A view is kept as long as its row still holds the
+        # same move, so per-move state such as the notation sounds survives between frames.
+        history = self._history
+        del history[self.ply:]
+        for i, move in enumerate((self.moveStack[:self.ply] & MOVE_MASK).tolist()):
+            if i < len(history) and history[i].moveID == move:
+                continue
+            del history[i:]
+            history.append(unpackMove(move))
+        return history
+
+    @property
+    def allOcc(self):
+        return int(self.occ[WHITE] | self.occ[BLACK])
+
+    def toggleMove(self, move):
+        # the board side of making or unmaking a move runs compiled; returns the pieces' key change
+        self._board = None
+        self._attacked = None
+        return int(toggleBoards(self.bb, self.occ, move))
+
+    def growStacks(self):
+        # there is no fifty-move rule, so a game has no length limit
+        size = len(self.moveStack)
+        self.moveStack = np.resize(self.moveStack, 2 * size)
+        self.keyStack = np.resize(self.keyStack, 2 * size)
+        self.moveLists.extend([] for _ in range(size))
 
     def makeMove(self, move):
-        self.board[move.startRow][move.startCol] = "--"
-        self.board[move.endRow][move.endCol] = move.pieceMoved
-        self.moveHistory.append(move)
-        self.whiteMoves = not self.whiteMoves
-
-        if move.pieceMoved == "wK":
-            self.whiteKingLocation = (move.endRow, move.endCol)
-        elif move.pieceMoved == "bK":
-            self.blackKingLocation = (move.endRow, move.endCol)
-
-        if move.isPawnPromotion:
-            self.board[move.endRow][move.endCol] = move.pieceMoved[0] + "Q"
-
-        if move.isEnpassantMove:
-            self.board[move.startRow][move.endCol] = "--"
-
-        if move.pieceMoved[1] == 'P' and abs(move.startRow - move.endRow) == 2:
-            self.enpassantPossible = ((move.startRow + move.endRow) // 2, move.startCol)
+        startSq = move & 63
+        endSq = move >> 6 & 63
+        piece = move >> 18 & 15
+        epSq = self.enpassantPossible[0] * 8 + self.enpassantPossible[1] if self.enpassantPossible else -1
+        if self.ply == len(self.moveStack):
+            self.growStacks()
+        self.moveStack[self.ply] = move | self.castleRights << 32 | (epSq + 1) << 36
+        self.keyStack[self.ply] = self.key
+        self.ply += 1
+        self.key ^= self.stateKey() ^ self.toggleMove(move) ^ ZOB_SIDE
+        self.side ^= 1
+
+        if piece == WHITE * 6 + KING:
+            self.whiteKingLocation = (endSq >> 3, endSq & 7)
+        elif piece == BLACK * 6 + KING:
+            self.blackKingLocation = (endSq >> 3, endSq & 7)
+
+        if piece % 6 == PAWN and abs(endSq - startSq) == 16:
+            self.enpassantPossible = ((startSq + endSq) >> 4, startSq & 7)
         else:
             self.enpassantPossible = ()
 
-        if move.isCastleMove:
-            if move.endCol - move.startCol == 2:
-                self.board[move.endRow][move.endCol - 1] = self.board[move.endRow][move.endCol + 1]
-                self.board[move.endRow][move.endCol + 1] = '--'
+        if move >> 12 & FLAG_CASTLE:
+            if piece < 6:
+                self.whiteCastled = True
             else:
-                self.board[move.endRow][move.endCol + 1] = self.board[move.endRow][move.endCol - 2]
-                self.board[move.endRow][move.endCol - 2] = '--'
-
-            if self.whiteMoves:
                 self.blackCastled = True
-            else:
-                self.whiteCastled = True
-
-        self.enpassantPossibleLog.append(self.enpassantPossible)
 
-        self.updateCastleRights(move)
-        self.castleRightsHistory.append(CastleRights(self.currentCastlingRight.wks,
-                                                     self.currentCastlingRight.bks,
-                                                     self.currentCastlingRight.wqs,
-                                                     self.currentCastlingRight.bqs))
+        # moving the king or a rook, or capturing a rook, clears the rights tied to those squares
+        self.castleRights &= CASTLE_CLEAR[startSq] & CASTLE_CLEAR[endSq]
+        self.key ^= self.stateKey()
 
     def undoMove(self):
-        if len(self.moveHistory) != 0:
-            move = self.moveHistory.pop()
-            self.board[move.startRow][move.startCol] = move.pieceMoved
-            self.board[move.endRow][move.endCol] = move.pieceCaptured
-            self.whiteMoves = not self.whiteMoves
-
-            if move.pieceMoved == "wK":
-                self.whiteKingLocation = (move.startRow, move.startCol)
-            elif move.pieceMoved == "bK":
-                self.blackKingLocation = (move.startRow, move.startCol)
-
-            if move.isEnpassantMove:
-                self.board[move.endRow][move.endCol] = '--'
-                self.board[move.startRow][move.endCol] = move.pieceCaptured
-
-            self.enpassantPossibleLog.pop()
-            self.enpassantPossible = self.enpassantPossibleLog[-1]
-
-            self.castleRightsHistory.pop()
-            newRights = self.castleRightsHistory[-1]
-            self.currentCastlingRight = CastleRights(newRights.wks, newRights.bks, newRights.wqs, newRights.bqs)
-
-            if move.isCastleMove:
-                if move.endCol - move.startCol == 2:
-                    self.board[move.endRow][move.endCol + 1] = self.board[move.endRow][move.endCol - 1]
-                    self.board[move.endRow][move.endCol - 1] = '--'
-                else:
-                    self.board[move.endRow][move.endCol - 2] = self.board[move.endRow][move.endCol + 1]
-                    self.board[move.endRow][move.endCol + 1] = '--'
-
-                if self.whiteMoves:
+        if self.ply != 0:
+            self.ply -= 1
+            entry = int(self.moveStack[self.ply])
+            move = entry & MOVE_MASK
+            castleRights = entry >> 32 & CASTLE_ALL
+            epSq = (entry >> 36) - 1
+            self.toggleMove(move)
+            self.key = int(self.keyStack[self.ply])
+            self.side ^= 1
+
+            startSq = move & 63
+            piece = move >> 18 & 15
+            if piece == WHITE * 6 + KING:
+                self.whiteKingLocation = (startSq >> 3, startSq & 7)
+            elif piece == BLACK * 6 + KING:
+                self.blackKingLocation = (startSq >> 3, startSq & 7)
+
+            self.enpassantPossible = (epSq >> 3, epSq & 7) if epSq >= 0 else ()
+            self.castleRights = castleRights
+
+            if move >> 12 & FLAG_CASTLE:
+                if piece < 6:
                     self.whiteCastled = False
                 else:
                     self.blackCastled = False
@@ -115,57 +201,18 @@ class GameState:
             self.checkMate = False
             self.staleMate = False
 
-    def updateCastleRights(self, move):
-        if move.pieceMoved == 'wK':
-            self.currentCastlingRight.wks = False
-            self.currentCastlingRight.wqs = False
-        elif move.pieceMoved == 'bK':
-            self.currentCastlingRight.bks = False
-            self.currentCastlingRight.bqs = False
-        elif move.pieceMoved == 'wR':
-            if move.startRow == 7:
-                if move.startCol == 0:
-                    self.currentCastlingRight.wqs = False
-                elif move.startCol == 7:
-                    self.currentCastlingRight.wks = False
-        elif move.pieceMoved == 'bR':
-            if move.startRow == 0:
-                if move.startCol == 0:
-                    self.currentCastlingRight.bqs = False
-                elif move.startCol == 7:
-                    self.currentCastlingRight.bks = False
-        elif move.pieceCaptured == 'wR':
-            if move.endRow == 7:
-                if move.endCol == 0:
-                    self.currentCastlingRight.wqs = False
-                elif move.endCol == 7:
-                    self.currentCastlingRight.wks = False
-        elif move.pieceCaptured == 'bR':
-            if move.endRow == 0:
-                if move.endCol == 0:
-                    self.currentCastlingRight.bqs = False
-                elif move.endCol == 7:
-                    self.currentCastlingRight.bks = False
-
     def getValidMoves(self):
-        tempEnpassantPossible = self.enpassantPossible
-        tempCastleRight = CastleRights(self.currentCastlingRight.wks, self.currentCastlingRight.bks,
-                                       self.currentCastlingRight.wqs, self.currentCastlingRight.bqs)
-
-        moves = self.getAllPossibleMoves()
-
-        if self.whiteMoves:
-            self.getCastleMoves(self.whiteKingLocation[0], self.whiteKingLocation[1], moves)
+        # Search reaches the same position through different move orders and the UI asks again every
+        # frame, so legal moves are cached by Zobrist key. Each key owns one slot of a fixed-size table
+        # and a newer position simply replaces the one stored there.
+        slot = self.key & (MOVE_CACHE_SIZE - 1)
+        cached = self.moveCache[slot]
+        if cached is not None and cached[0] == self.key:
+            moves = self.moveLists[self.ply]
+            moves[:] = cached[1]
         else:
-            self.getCastleMoves(self.blackKingLocation[0], self.blackKingLocation[1], moves)
-
-        for i in range(len(moves) - 1, -1, -1):
-            self.makeMove(moves[i])
-            self.whiteMoves = not self.whiteMoves
-            if self.inCheck():
-                moves.remove(moves[i])
-            self.whiteMoves = not self.whiteMoves
-            self.undoMove()
+            moves = self.generateValidMoves()
+            self.moveCache[slot] = (self.key, tuple(moves))
 
         if len(moves) == 0:
             if self.inCheck():
@@ -188,203 +235,158 @@ class GameState:
             self.checkMate = False
             self.staleMate = False
 
-        self.enpassantPossible = tempEnpassantPossible
-        self.currentCastlingRight = tempCastleRight
         return moves
 
-    def inCheck(self):
-        if self.whiteMoves:
-            return self.squareUnderAttack(self.whiteKingLocation[0], self.whiteKingLocation[1])
-        else:
-            return self.squareUnderAttack(self.blackKingLocation[0], self.blackKingLocation[1])
-
-    def squareUnderAttack(self, row, col):
-        self.whiteMoves = not self.whiteMoves
-        opponentMoves = self.getAllPossibleMoves()
-        self.whiteMoves = not self.whiteMoves
-        for move in opponentMoves:
-            if move.endRow == row and move.endCol == col:
-                return True
-        return False
+    def generateValidMoves(self, stage=ALL):
+        # stage is CAPTURES, QUIETS or ALL; the captures come first either way, so a search can also
+        # take the captures on their own and only generate the quiet moves if it still needs them
+        moves = self.getAllPossibleMoves(stage)
 
-    def getAllPossibleMoves(self):
-        moves = []
-        for row in range(len(self.board)):
-            for col in range(len(self.board[row])):
-                turn = self.board[row][col][0]
-                if (turn == 'w' and self.whiteMoves) or (turn == 'b' and not self.whiteMoves):
-                    piece = self.board[row][col][1]
-                    self.moveFunctions[piece](row, col, moves)
+        # castling is a quiet move
+        if stage & QUIETS:
+            if self.side == WHITE:
+                self.getCastleMoves(self.whiteKingLocation[0], self.whiteKingLocation[1], moves)
+            else:
+                self.getCastleMoves(self.blackKingLocation[0], self.blackKingLocation[1], moves)
+
+        # Pins and checks are resolved by the generator, so only en passant, which takes two pieces off
+        # a rank at once, still needs a make/undo probe. The legal moves are compacted to the front in
+        # place instead of being removed one by one.
+        legal = 0
+        for move in moves:
+            if move >> 12 & FLAG_ENPASSANT:
+                self.makeMove(move)
+                self.side ^= 1
+                leavesKingInCheck = self.inCheck()
+                self.side ^= 1
+                self.undoMove()
+                if leavesKingInCheck:
+                    continue
+            moves[legal] = move
+            legal += 1
+        del moves[legal:]
         return moves
 
-    def getPawnMoves(self, row, col, moves):
-        if self.whiteMoves:
-            if self.board[row - 1][col] == "--":  # advance pawn
-                moves.append(Move((row, col), (row - 1, col), self.board))
-                if row == 6 and self.board[row - 2][col] == "--":
-                    moves.append(Move((row, col), (row - 2, col), self.board))
-
-            if col - 1 >= 0:  # capture the left pawn
-                if self.board[row - 1][col - 1][0] == 'b':  # the top left piece is black
-                    moves.append(Move((row, col), (row - 1, col - 1), self.board))
-                if (row - 1, col - 1) == self.enpassantPossible:
-                    moves.append(Move((row, col), (row - 1, col - 1), self.board, enpassantPossible=True))
-
-            if col + 1 <= 7:  # Capture the right pawn
-                if self.board[row - 1][col + 1][0] == 'b':  # the top left piece is black
-                    moves.append(Move((row, col), (row - 1, col + 1), self.board))
-                if (row - 1, col + 1) == self.enpassantPossible:
-                    moves.append(Move((row, col), (row - 1, col + 1), self.board, enpassantPossible=True))
-        else:
-            if self.board[row + 1][col] == "--":  # advance pawn
-                moves.append(Move((row, col), (row + 1, col), self.board))
-                if row == 1 and self.board[row + 2][col] == "--":
-                    moves.append(Move((row, col), (row + 2, col), self.board))
-
-            if col - 1 >= 0:  # capture the left pawn
-                if self.board[row + 1][col - 1][0] == 'w':  # the top left piece is black
-                    moves.append(Move((row, col), (row + 1, col - 1), self.board))
-                if (row + 1, col - 1) == self.enpassantPossible:
-                    moves.append(Move((row, col), (row + 1, col - 1), self.board, enpassantPossible=True))
-
-            if col + 1 <= 7:  # capture the left pawn
-                if self.board[row + 1][col + 1][0] == 'w':  # the top left piece is black
-                    moves.append(Move((row, col), (row + 1, col + 1), self.board))
-                if (row + 1, col + 1) == self.enpassantPossible:
-                    moves.append(Move((row, col), (row + 1, col + 1), self.board, enpassantPossible=True))
-
-    def getRookMoves(self, row, col, moves):
-        directions = ((-1, 0), (0, -1), (1, 0), (0, 1))  # up, left, down, right
-        enemyColor = "b" if self.whiteMoves else "w"
-        for d in directions:
-            for i in range(1, 8):
-                endRow = row + d[0] * i
-                endCol = col + d[1] * i
-                if 0 <= endRow < 8 and 0 <= endCol < 8:
-                    endPiece = self.board[endRow][endCol]
-                    if endPiece == "--":
-                        moves.append(Move((row, col), (endRow, endCol), self.board))
-                    elif endPiece[0] == enemyColor:
-                        moves.append(Move((row, col), (endRow, endCol), self.board))
-                        break  # break here so as not to skip the opponent's pieces => he looks in another direction
-                    else:
-                        break  # piece of the same color
-                else:
-                    break  # off the board
-
-    def getKnightMoves(self, row, col, moves):
-        directions = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
-        allyColor = "w" if self.whiteMoves else "b"
-        for d in directions:
-            endRow = row + d[0]
-            endCol = col + d[1]
-            if 0 <= endRow <= 7 and 0 <= endCol <= 7:
-                endPiece = self.board[endRow][endCol]
-                if endPiece[0] != allyColor:
-                    moves.append(Move((row, col), (endRow, endCol), self.board))
-
-    def getBishopMoves(self, row, col, moves):
-        directions = ((-1, -1), (1, -1), (-1, 1), (1, 1))  # top left, bottom left, top right, bottom right
-        enemyColor = "b" if self.whiteMoves else "w"
-        for d in directions:
-            for i in range(1, 8):
-                endRow = row + d[0] * i
-                endCol = col + d[1] * i
-                if 0 <= endRow <= 7 and 0 <= endCol <= 7:
-                    endPiece = self.board[endRow][endCol]
-                    if endPiece == "--":
-                        moves.append(Move((row, col), (endRow, endCol), self.board))
-                    elif endPiece[0] == enemyColor:
-                        moves.append(Move((row, col), (endRow, endCol), self.board))
-                        break  # break here so as not to skip the opponent's pieces => he looks in another direction
-                    else:
-                        break  # piece of the same color
-                else:
-                    break  # off the board
-
-    def getQueenMoves(self, row, col, moves):
-        self.getRookMoves(row, col, moves)
-        self.getBishopMoves(row, col, moves)
-
-    def getKingMoves(self, row, col, moves):
-        directions = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
-        allyColor = "w" if self.whiteMoves else "b"
-        for d in directions:
-            endRow = row + d[0]
-            endCol = col + d[1]
-            if 0 <= endRow <= 7 and 0 <= endCol <= 7:
-                endPiece = self.board[endRow][endCol]
-                if endPiece[0] != allyColor:
-                    moves.append(Move((row, col), (endRow, endCol), self.board))
+    def inCheck(self):
+        # one attackers-of lookup from the king square, not a generation of the opponent's moves
+        row, col = self.whiteKingLocation if self.side == WHITE else self.blackKingLocation
+        return squareAttacked(self.bb, row * 8 + col, self.side ^ 1, self.occ[WHITE] | self.occ[BLACK])
+
+    def attackedByEnemy(self):
+        # every square the opponent attacks, computed once per position. Our king is taken off the
+        # board first so that stepping back along a checking ray is not mistaken for a safe square.
+        if self._attacked is None:
+            occ = (self.occ[WHITE] | self.occ[BLACK]) ^ self.bb[self.side * 6 + KING]
+            self._attacked = attackedSquares(self.bb, self.side ^ 1, occ)
+        return self._attacked
+
+    def getAllPossibleMoves(self, stage=ALL):
+        # captures come first, most valuable victim first, so alpha-beta cuts off sooner.
+        # These are not yet legal: en passant is checked and castling added by generateValidMoves.
+        # Every ply refills its own list instead of allocating a new one, so a search can keep iterating
+        # a ply's moves while deeper plies generate theirs. Copy the list to keep it past the next call.
+        epSq = self.enpassantPossible[0] * 8 + self.enpassantPossible[1] if self.enpassantPossible else -1
+        n = genAllMoves(self.bb, self.side, epSq, self.attackedByEnemy(), stage, self.occ[self.side],
+                        self.occ[self.side ^ 1], self.moveBuffer)
+        moves = self.moveLists[self.ply]
+        moves[:] = self.moveBuffer[:n].tolist()
+        return moves
 
     def getCastleMoves(self, row, col, moves):
+        attacked = int(self.attackedByEnemy())
         # you can't castle if the king is in check
-        if self.squareUnderAttack(row, col):
+        if attacked & (1 << (row * 8 + col)):
             return
 
-        if (self.whiteMoves and self.currentCastlingRight.wks) or (
-                not self.whiteMoves and self.currentCastlingRight.bks):
-            self.getKingsideCastleMoves(row, col, moves)
-        if (self.whiteMoves and self.currentCastlingRight.wqs) or (
-                not self.whiteMoves and self.currentCastlingRight.bqs):
-            self.getQueensideCastleMoves(row, col, moves)
+        if self.castleRights & KINGSIDE_RIGHT[self.side]:
+            self.getKingsideCastleMoves(row, col, moves, attacked)
+        if self.castleRights & QUEENSIDE_RIGHT[self.side]:
+            self.getQueensideCastleMoves(row, col, moves, attacked)
 
-    def getKingsideCastleMoves(self, row, col, moves):
-        if self.board[row][col + 1] == "--" and self.board[row][col + 2] == "--":
-            if not self.squareUnderAttack(row, col + 1) and not self.squareUnderAttack(row, col + 2):
-                moves.append(Move((row, col), (row, col + 2), self.board, isCastleMove=True))
+    def getKingsideCastleMoves(self, row, col, moves, attacked):
+        sq = row * 8 + col
+        path = (1 << (sq + 1)) | (1 << (sq + 2))
+        if not self.allOcc & path and not attacked & path:
+            moves.append(packMove(sq, sq + 2, FLAG_CASTLE, 0, self.side * 6 + KING, NO_PIECE))
 
-    def getQueensideCastleMoves(self, row, col, moves):
-        if self.board[row][col - 1] == '--' and self.board[row][col - 2] == '--' and self.board[row][col - 3] == '--':
-            if not self.squareUnderAttack(row, col - 1) and not self.squareUnderAttack(row, col - 2):
-                moves.append(Move((row, col), (row, col - 2), self.board, isCastleMove=True))
+    def getQueensideCastleMoves(self, row, col, moves, attacked):
+        sq = row * 8 + col
+        if not self.allOcc & ((1 << (sq - 1)) | (1 << (sq - 2)) | (1 << (sq - 3))):
+            if not attacked & ((1 << (sq - 1)) | (1 << (sq - 2))):
+                moves.append(packMove(sq, sq - 2, FLAG_CASTLE, 0, self.side * 6 + KING, NO_PIECE))
 
 
-class CastleRights:
-    def __init__(self, wks, bks, wqs, bqs):
-        self.wks = wks
-        self.bks = bks
-        self.wqs = wqs
-        self.bqs = bqs
+def packMove(startSq, endSq, flags, promotion, piece, captured):
+    return startSq | endSq << 6 | flags << 12 | promotion << 15 | piece << 18 | captured << 22
 
 
-class Move:
-    # dictionaries to map the relationship (rank - file) (line column)
-    ranksToRows = {"1": 7, "2": 6, "3": 5, "4": 4,
-                   "5": 3, "6": 2, "7": 1, "8": 0}
-    rowsToRanks = {v: k for k, v in ranksToRows.items()}
+def unpackMove(move):
+    # the engine passes moves around as packed ints; the UI and the notation work on Move objects
+    startSq = move & 63
+    endSq = move >> 6 & 63
+    flags = move >> 12 & 7
+    captured = move >> 22 & 15
+    return Move((startSq >> 3, startSq & 7), (endSq >> 3, endSq & 7), None,
+                enpassantPossible=bool(flags & FLAG_ENPASSANT), isCastleMove=bool(flags & FLAG_CASTLE),
+                pieceMoved=PIECE_NAMES[move >> 18 & 15],
+                pieceCaptured=PIECE_NAMES[captured] if captured != NO_PIECE else "--",
+                promotionPiece=PIECE_NAMES[move >> 15 & 7][1] if flags & FLAG_PROMOTION else "Q")
 
-    filesToCols = {"a": 0, "b": 1, "c": 2, "d": 3,
-                   "e": 4, "f": 5, "g": 6, "h": 7}
-    colsToFiles = {v: k for k, v in filesToCols.items()}
 
-    def __init__(self, startSq, endSq, board, enpassantPossible=False, isCastleMove=False):
+def squareIndex(name):
+    # inverse of SQUARE_NAMES: "a8" -> 0, "h1" -> 63
+    return (ord("8") - ord(name[1])) * 8 + ord(name[0]) - ord("a")
+
+
+class Move:
+    __slots__ = ("startRow", "startCol", "endRow", "endCol", "pieceMoved", "pieceCaptured", "isPawnPromotion",
+                 "promotionPiece", "isEnpassantMove", "isCastleMove", "moveID", "play")
+
+    def __init__(self, startSq, endSq, board, enpassantPossible=False, isCastleMove=False,
+                 pieceMoved=None, pieceCaptured=None, promotionPiece="Q"):
         self.startRow = startSq[0]
         self.startCol = startSq[1]
         self.endRow = endSq[0]
         self.endCol = endSq[1]
-        self.pieceMoved = board[self.startRow][self.startCol]
-        self.pieceCaptured = board[self.endRow][self.endCol]
+        # the engine passes the pieces in directly; the UI reads them off the rendered board
+        self.pieceMoved = pieceMoved if pieceMoved is not None else board[self.startRow, self.startCol]
+        self.pieceCaptured = pieceCaptured if pieceCaptured is not None else board[self.endRow, self.endCol]
         self.isPawnPromotion = False
 
         if (self.pieceMoved == 'wP' and self.endRow == 0) or (self.pieceMoved == 'bP' and self.endRow == 7):
             self.isPawnPromotion = True
+        # chosen by whoever builds the move; the UI always promotes to a queen
+        self.promotionPiece = promotionPiece
 
-        self.isEnpassantMove = enpassantPossible
+        # a pawn moving diagonally onto an empty square can only be capturing en passant, and a king
+        # moving two files can only be castling, so moves built from a board click get the same flags
+        self.isEnpassantMove = enpassantPossible or (self.pieceMoved[1] == 'P' and self.startCol != self.endCol
+                                                     and self.pieceCaptured == "--")
         if self.isEnpassantMove:
             self.pieceCaptured = 'wP' if self.pieceMoved == 'bP' else 'bP'
 
-        self.isCastleMove = isCastleMove
+        self.isCastleMove = isCastleMove or (self.pieceMoved[1] == 'K' and abs(self.endCol - self.startCol) == 2)
 
-        # hash code for a move
-        self.moveID = self.startRow * 1000 + self.startCol * 1000 + self.endRow * 10 + self.endCol
+        # hash code for a move: the packed int the engine generates, so a clicked move compares equal
+        flags = 0
+        promotion = 0
+        if self.isEnpassantMove:
+            flags |= FLAG_ENPASSANT
+        if self.isCastleMove:
+            flags |= FLAG_CASTLE
+        if self.isPawnPromotion:
+            flags |= FLAG_PROMOTION
+            promotion = PIECE_INDEX["w" + self.promotionPiece]
+        self.moveID = packMove(self.startRow * 8 + self.startCol, self.endRow * 8 + self.endCol, flags, promotion,
+                               PIECE_INDEX.get(self.pieceMoved, NO_PIECE),
+                               PIECE_INDEX.get(self.pieceCaptured, NO_PIECE))
         self.play = 0
 
     def getChessNotation(self):
 
         outString = ""
         if self.isPawnPromotion:
-            outString += self.getRankFile(self.endRow, self.endCol) + "Q"
+            outString += self.getRankFile(self.endRow, self.endCol) + self.promotionPiece
 
         if self.isCastleMove:
             if self.play == 0:
@@ -398,12 +400,10 @@ class Move:
                 outString += "0-0-0"
 
         if self.isEnpassantMove:
-            outString += self.getRankFile(self.startRow, self.startCol)[0] + "x" + self.getRankFile(self.endRow,
-                                                                                                    self.endCol) + " e.p."
+            outString += FILES[self.startCol] + "x" + self.getRankFile(self.endRow, self.endCol) + " e.p."
         if self.pieceCaptured != "--":
             if self.pieceMoved[1] == "P" and not self.isEnpassantMove:
-                outString += self.getRankFile(self.startRow, self.startCol)[0] + "x" + self.getRankFile(
-                    self.endRow, self.endCol)
+                outString += FILES[self.startCol] + "x" + self.getRankFile(self.endRow, self.endCol)
             if self.play == 0:
                 captureSound = p.mixer.Sound(r"../images/ChessCaptureSound.mp3")
                 captureSound.play()
@@ -420,10 +420,13 @@ class Move:
         return outString
 
     def getRankFile(self, row, col):
-        return self.colsToFiles[col] + self.rowsToRanks[row]
+        return SQUARE_NAMES[row * 8 + col]
 
     # two moves are equal if they have the same initial and final position and the same piece has moved
     def __eq__(self, other):
         if isinstance(other, Move):
             return self.moveID == other.moveID
         return False
+
+    def __hash__(self):
+        return self.moveID
@@ -0,0 +1,584 @@
+import random
+import numpy as np
+from numba import njit
+from numba.cpython.unsafe.numbers import trailing_zeros
+
+
+# Bitboard tables and the numba kernels that generate moves from them. Everything in here works on the
+# uint64 piece bitboards only, so it has to stay plain numeric code; GameState in ChessEngine drives it.
+
+# piece kinds; a piece's bitboard index is color * 6 + kind
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+WHITE, BLACK = 0, 1
+
+ROOK_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))  # up, down, left, right
+BISHOP_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))  # top left, top right, bottom left, bottom right
+
+# magic multipliers for the a8 = 0 square numbering, one per square
+ROOK_MAGICS = np.array([
+    0x1880088040002010, 0x0040001000200040, 0x0100200011004008, 0x0480048800100080,
+    0x0880040080080002, 0x0a00020004081001, 0x0080010000800200, 0x0100084080250006,
+    0x8882002200410088, 0x0402002100820050, 0x4101002000104101, 0x8000800800801000,
+    0x0000800800800400, 0x0400800400020080, 0x0004000408100201, 0x0102001089240042,
+    0x0100208000400090, 0x1bb004c020044004, 0x8920010010410020, 0x4245010008201006,
+    0x0001010010040800, 0x0000818012000400, 0x0888440001101832, 0x08000200050a5084,
+    0x0400802180004011, 0x4482c00280200088, 0x8490200080100080, 0x0830090100201000,
+    0x0040080080040080, 0x6002008080040002, 0x1404100400080201, 0x0010010200189044,
+    0x0180004001402000, 0x0080200080804000, 0x0000110041002008, 0x0180210209001000,
+    0x2018100801000500, 0x0e00800200800400, 0x0400081114002250, 0x0480008042000104,
+    0x0080008040008020, 0x0000400100810020, 0x0001022000430010, 0x001000100d010020,
+    0x0004004080080800, 0x0002016408220010, 0x1000020001008080, 0x0103058c00420021,
+    0x8000260040890200, 0x0101020040249600, 0x4010872001100080, 0x1b00080080100080,
+    0x2001801400080180, 0x4202000590080200, 0x0181008200640f00, 0x0040040080510200,
+    0x0002a04011018001, 0x2201048010400821, 0x001200400a108022, 0x8404100004090021,
+    0x645200102029040e, 0x0401002400028831, 0x0032000c11880106, 0x1a01150880240042
+], dtype=np.uint64)
+
+BISHOP_MAGICS = np.array([
+    0x0228390426840101, 0x0010320800408810, 0x0804040400442000, 0x4484104207200002,
+    0x0204042000844000, 0x0282025004040101, 0x0040540208402060, 0x4403104208201880,
+    0x0020a00202820400, 0x4840020224040080, 0x0002410411004a00, 0x0400042401880340,
+    0x0004041045210000, 0x4081891120100004, 0x0900020084054080, 0x40401220a4100880,
+    0x0005044010048108, 0x0330805826082544, 0x0002000104010200, 0x0020400404108051,
+    0x0006101401202125, 0x0041030201008202, 0x0000408422021000, 0x0130482031041000,
+    0x0042084421208440, 0x4042206002080a04, 0x0009884210004200, 0x4001080024004010,
+    0x2801001001004008, 0x200040404201100c, 0x0004011000411000, 0x1001010042104100,
+    0x0004c22008082024, 0x0088900410280806, 0x0c40140204300084, 0x0001020080080080,
+    0x0092088400020020, 0x0000900084010082, 0x61040102011400a0, 0x0012040051010040,
+    0x5208084405081082, 0x0000420220605004, 0x4008320905001000, 0x4400004010410a00,
+    0x0000080104400400, 0x8201100100420200, 0x8260120202003460, 0x00028485010b0a00,
+    0x2104040268450084, 0x0402240a08040010, 0x4890002201100284, 0x0080330084110420,
+    0x0000040821010444, 0x008c200202820001, 0x084023021a020600, 0x0120040082004a11,
+    0x0090104110101040, 0x1000810121100220, 0x801400811080b002, 0x2800000001040908,
+    0x4200000040104448, 0xc1015018500d1a00, 0x0000040408120408, 0x0040106d02408880
+], dtype=np.uint64)
+
+
+def slidingMask(sq, directions):
+    # the squares whose occupancy can block a ray, i.e. every ray square except the edge one
+    row, col = sq >> 3, sq & 7
+    mask = 0
+    for dRow, dCol in directions:
+        endRow, endCol = row + dRow, col + dCol
+        while 0 <= endRow + dRow <= 7 and 0 <= endCol + dCol <= 7:
+            mask |= 1 << (endRow * 8 + endCol)
+            endRow, endCol = endRow + dRow, endCol + dCol
+    return mask
+
+
+def maskSubsets(mask):
+    # every occupancy pattern of the mask's bits, built for all patterns at once
+    bits = [i for i in range(64) if mask >> i & 1]
+    index = np.arange(1 << len(bits), dtype=np.uint64)
+    subsets = np.zeros(len(index), dtype=np.uint64)
+    for j, bit in enumerate(bits):
+        subsets |= ((index >> np.uint64(j)) & np.uint64(1)) << np.uint64(bit)
+    return subsets
+
+
+def slidingAttacks(sq, directions, occupancies):
+    # classic ray walk, done once per occupancy pattern when the tables are built
+    row, col = sq >> 3, sq & 7
+    attacks = np.zeros(len(occupancies), dtype=np.uint64)
+    for dRow, dCol in directions:
+        blocked = np.zeros(len(occupancies), dtype=bool)
+        endRow, endCol = row + dRow, col + dCol
+        while 0 <= endRow <= 7 and 0 <= endCol <= 7:
+            bit = np.uint64(1 << (endRow * 8 + endCol))
+            attacks[~blocked] |= bit
+            blocked |= (occupancies & bit) != 0
+            endRow, endCol = endRow + dRow, endCol + dCol
+    return attacks
+
+
+def buildMagicTables(directions, magics):
+    # attacks for all squares share one flat table; each square owns a 1 << bits slice of it
+    masks = np.zeros(64, dtype=np.uint64)
+    shifts = np.zeros(64, dtype=np.uint64)
+    offsets = np.zeros(64, dtype=np.uint64)
+    subsets = []
+    for sq in range(64):
+        mask = slidingMask(sq, directions)
+        masks[sq] = mask
+        shifts[sq] = 64 - mask.bit_count()
+        subsets.append(maskSubsets(mask))
+        if sq < 63:
+            offsets[sq + 1] = offsets[sq] + len(subsets[sq])
+    attacks = np.zeros(int(offsets[63]) + len(subsets[63]), dtype=np.uint64)
+    for sq in range(64):
+        index = (offsets[sq] + ((subsets[sq] * magics[sq]) >> shifts[sq])).astype(np.int64)
+        attacks[index] = slidingAttacks(sq, directions, subsets[sq])
+    return masks, shifts, offsets, attacks
+
+
+ROOK_MASKS, ROOK_SHIFTS, ROOK_OFFSETS, ROOK_ATTACKS = buildMagicTables(ROOK_DIRECTIONS, ROOK_MAGICS)
+BISHOP_MASKS, BISHOP_SHIFTS, BISHOP_OFFSETS, BISHOP_ATTACKS = buildMagicTables(BISHOP_DIRECTIONS, BISHOP_MAGICS)
+
+
+KNIGHT_OFFSETS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+KING_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+def buildStepTable(offsets):
+    table = np.zeros(64, dtype=np.uint64)
+    for sq in range(64):
+        row, col = sq >> 3, sq & 7
+        for dRow, dCol in offsets:
+            if 0 <= row + dRow <= 7 and 0 <= col + dCol <= 7:
+                table[sq] |= np.uint64(1 << ((row + dRow) * 8 + col + dCol))
+    return table
+
+
+KNIGHT_ATTACKS = buildStepTable(KNIGHT_OFFSETS)
+KING_ATTACKS = buildStepTable(KING_OFFSETS)
+
+
+def buildPawnTable():
+    # the squares a pawn of each colour attacks from every square
+    table = np.zeros((2, 64), dtype=np.uint64)
+    for sq in range(64):
+        for dCol in (-1, 1):
+            if 0 <= (sq & 7) + dCol <= 7:
+                if sq >= 8:
+                    table[WHITE, sq] |= np.uint64(1 << (sq - 8 + dCol))
+                if sq < 56:
+                    table[BLACK, sq] |= np.uint64(1 << (sq + 8 + dCol))
+    return table
+
+
+PAWN_ATTACKS = buildPawnTable()
+
+
+DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+# index of the direction pointing the other way, e.g. up <-> down
+OPPOSITE = tuple(DIRECTIONS.index((-dRow, -dCol)) for dRow, dCol in DIRECTIONS)
+
+
+def buildRayTable():
+    # every square a slider sees from each square in each direction on an empty board
+    table = np.zeros((64, len(DIRECTIONS)), dtype=np.uint64)
+    empty = np.zeros(1, dtype=np.uint64)
+    for sq in range(64):
+        for d, direction in enumerate(DIRECTIONS):
+            table[sq, d] = slidingAttacks(sq, (direction,), empty)[0]
+    return table
+
+
+RAY = buildRayTable()
+
+
+def buildLineTables():
+    # for two aligned squares, the whole line through them and the squares strictly between them;
+    # 0 when they are not aligned
+    line = np.zeros((64, 64), dtype=np.uint64)
+    between = np.zeros((64, 64), dtype=np.uint64)
+    for sq in range(64):
+        for d in range(len(DIRECTIONS)):
+            ray = int(RAY[sq, d])
+            while ray:
+                target = (ray & -ray).bit_length() - 1
+                ray &= ray - 1
+                line[sq, target] = RAY[sq, d] | RAY[sq, OPPOSITE[d]] | np.uint64(1 << sq)
+                between[sq, target] = RAY[sq, d] & RAY[target, OPPOSITE[d]]
+    return line, between
+
+
+LINE, BETWEEN = buildLineTables()
+
+# the a and h files, and the rows a pawn lands on after its first single step
+FILE_A = np.uint64(0x0101010101010101)
+FILE_H = FILE_A << np.uint64(7)
+RANK_3 = np.uint64(0xFF) << np.uint64(40)
+RANK_6 = np.uint64(0xFF) << np.uint64(16)
+
+
+# Zobrist keys, seeded so that a position hashes the same in every run. The piece keys are a uint64
+# table since the board toggles that use them are compiled; the rest are plain ints for makeMove.
+zobristRandom = random.Random(0x5EED)
+ZOB_PIECE = np.array([[zobristRandom.getrandbits(64) for sq in range(64)] for piece in range(12)], dtype=np.uint64)
+ZOB_CASTLE = tuple(zobristRandom.getrandbits(64) for rights in range(16))
+ZOB_EP_FILE = tuple(zobristRandom.getrandbits(64) for col in range(8))
+ZOB_SIDE = zobristRandom.getrandbits(64)
+
+
+# A move is one int: from | to << 6 | flags << 12 | promotion << 15 | piece << 18 | captured << 22,
+# with the promotion as a piece kind and the pieces as bitboard indexes (NO_PIECE when nothing is taken).
+FLAG_ENPASSANT, FLAG_CASTLE, FLAG_PROMOTION = 1, 2, 4
+NO_PIECE = 15
+PROMOTION_KINDS = (QUEEN, KNIGHT, ROOK, BISHOP)
+# generation stages, so captures can be produced (and searched) before quiet moves
+CAPTURES, QUIETS = 1, 2
+ALL = CAPTURES | QUIETS
+
+# captures are ordered most valuable victim first, least valuable attacker second
+PIECE_VALUES = (1, 3, 3, 5, 9, 10)
+MVV_LVA = np.array([[victim * 10 - attacker for attacker in PIECE_VALUES] for victim in PIECE_VALUES], dtype=np.int64)
+
+
+@njit("uint64(int64)", cache=True)
+def squareBit(sq):
+    return np.uint64(1) << np.uint64(sq)
+
+
+@njit("int64(uint64)", cache=True)
+def lsbIndex(bb):
+    # count trailing zeros, which LLVM compiles to a single tzcnt/bsf instruction
+    return np.int64(trailing_zeros(bb))
+
+
+@njit("uint64(int64, uint64)", cache=True)
+def rookAttacks(sq, occ):
+    return ROOK_ATTACKS[ROOK_OFFSETS[sq] + (((occ & ROOK_MASKS[sq]) * ROOK_MAGICS[sq]) >> ROOK_SHIFTS[sq])]
+
+
+@njit("uint64(int64, uint64)", cache=True)
+def bishopAttacks(sq, occ):
+    return BISHOP_ATTACKS[BISHOP_OFFSETS[sq] + (((occ & BISHOP_MASKS[sq]) * BISHOP_MAGICS[sq]) >> BISHOP_SHIFTS[sq])]
+
+
+@njit("int64(uint64[:], int64, int64)", cache=True)
+def pieceOn(bb, sq, first):
+    bit = squareBit(sq)
+    for i in range(first, first + 6):
+        if bb[i] & bit:
+            return i
+    return NO_PIECE
+
+
+@njit("int64(int32[:], int64, int64, int64, int64, int64)", cache=True)
+def emitMove(out, n, startSq, endSq, piece, captured):
+    out[n] = startSq | endSq << 6 | piece << 18 | captured << 22
+    return n + 1
+
+
+@njit("int64(int32[:], int64, int64, int64, int64, int64)", cache=True)
+def emitPawnMove(out, n, startSq, endSq, piece, captured):
+    # a pawn reaching the last rank becomes one move per piece it can promote to
+    if endSq < 8 or endSq >= 56:
+        for kind in PROMOTION_KINDS:
+            n = emitMove(out, n, startSq, endSq, piece, captured)
+            out[n - 1] |= FLAG_PROMOTION << 12 | kind << 15
+        return n
+    return emitMove(out, n, startSq, endSq, piece, captured)
+
+
+@njit("int64(uint64[:], int64, int64, uint64, int64, int32[:], int64)", cache=True)
+def genTargetMoves(bb, sq, piece, targets, enemyFirst, out, n):
+    while targets:
+        endSq = lsbIndex(targets)
+        targets &= targets - np.uint64(1)
+        n = emitMove(out, n, sq, endSq, piece, pieceOn(bb, endSq, enemyFirst))
+    return n
+
+
+# Each generator walks the set bits of its own piece bitboard, so generation needs no per-square
+# piece lookup and no dispatch on the kind of piece found. targets holds the squares the current
+# stage may move to: enemy pieces for captures, empty squares for quiet moves. A pinned piece may
+# only move along the line through it and its king, which pinMask gives as one AND-mask.
+
+@njit("uint64(int64, int64, uint64)", cache=True)
+def pinMask(sq, kingSq, pinned):
+    if pinned & squareBit(sq):
+        return LINE[kingSq, sq]
+    return ~np.uint64(0)
+
+
+@njit("uint64(uint64[:], int64, uint64, uint64)", cache=True)
+def pinnedPieces(bb, color, ownOcc, allOcc):
+    # an enemy slider that sees our king through our own pieces only pins the piece standing
+    # between them if it is the only piece there
+    first = 6 - color * 6
+    kingSq = lsbIndex(bb[color * 6 + KING])
+    enemyOcc = allOcc ^ ownOcc
+    snipers = rookAttacks(kingSq, enemyOcc) & (bb[first + ROOK] | bb[first + QUEEN])
+    snipers |= bishopAttacks(kingSq, enemyOcc) & (bb[first + BISHOP] | bb[first + QUEEN])
+    pinned = np.uint64(0)
+    while snipers:
+        blockers = BETWEEN[kingSq, lsbIndex(snipers)] & allOcc
+        if blockers and not blockers & (blockers - np.uint64(1)):
+            pinned |= blockers
+        snipers &= snipers - np.uint64(1)
+    return pinned & ownOcc
+
+
+@njit("int64(uint64[:], int64, int64, uint64, uint64, int64, int64, uint64, uint64, int32[:], int64)", cache=True)
+def genPinnedPawnMoves(bb, color, epSq, allOcc, enemyOcc, stage, kingSq, pinned, evasions, out, n):
+    # pinned pawns go one at a time, each limited to the line through it and its king
+    piece = color * 6 + PAWN
+    enemyFirst = 6 - color * 6
+    forward = -8 if color == WHITE else 8
+    startRow = 6 if color == WHITE else 1
+    pawns = bb[piece] & pinned
+    while pawns:
+        sq = lsbIndex(pawns)
+        pawns &= pawns - np.uint64(1)
+        pin = LINE[kingSq, sq]
+        allowed = pin & evasions
+        if stage & QUIETS:
+            endSq = sq + forward
+            if not allOcc & squareBit(endSq):  # advance pawn
+                if allowed & squareBit(endSq):
+                    n = emitPawnMove(out, n, sq, endSq, piece, NO_PIECE)
+                if sq >> 3 == startRow and not allOcc & squareBit(endSq + forward) \
+                        and allowed & squareBit(endSq + forward):
+                    n = emitMove(out, n, sq, endSq + forward, piece, NO_PIECE)
+        if stage & CAPTURES:
+            targets = PAWN_ATTACKS[color, sq] & enemyOcc & allowed
+            while targets:
+                endSq = lsbIndex(targets)
+                targets &= targets - np.uint64(1)
+                n = emitPawnMove(out, n, sq, endSq, piece, pieceOn(bb, endSq, enemyFirst))
+            if epSq >= 0 and PAWN_ATTACKS[color, sq] & pin & squareBit(epSq):
+                n = emitMove(out, n, sq, epSq, piece, enemyFirst + PAWN)
+                out[n - 1] |= FLAG_ENPASSANT << 12
+    return n
+
+
+@njit("int64(uint64[:], uint64, int64, int64, int64, int32[:], int64)", cache=True)
+def emitPawnTargets(bb, targets, delta, piece, enemyFirst, out, n):
+    # every target square of one set-wise pawn step; the pawn came from delta squares back
+    while targets:
+        endSq = lsbIndex(targets)
+        targets &= targets - np.uint64(1)
+        n = emitPawnMove(out, n, endSq - delta, endSq, piece, pieceOn(bb, endSq, enemyFirst))
+    return n
+
+
+@njit("int64(uint64[:], int64, int64, uint64, uint64, int64, int64, uint64, uint64, int32[:], int64)", cache=True)
+def genPawnMoves(bb, color, epSq, allOcc, enemyOcc, stage, kingSq, pinned, evasions, out, n):
+    # Unpinned pawns move together: one shift of the pawn bitboard gives every pawn's push, or
+    # every pawn's capture towards one side, at once.
+    piece = color * 6 + PAWN
+    enemyFirst = 6 - color * 6
+    pawns = bb[piece] & ~pinned
+    empty = ~allOcc
+    if color == WHITE:
+        forward, left, right = -8, -9, -7
+        singles = (pawns >> np.uint64(8)) & empty
+        doubles = ((singles & RANK_3) >> np.uint64(8)) & empty
+        leftCaptures = ((pawns & ~FILE_A) >> np.uint64(9)) & enemyOcc
+        rightCaptures = ((pawns & ~FILE_H) >> np.uint64(7)) & enemyOcc
+    else:
+        forward, left, right = 8, 7, 9
+        singles = (pawns << np.uint64(8)) & empty
+        doubles = ((singles & RANK_6) << np.uint64(8)) & empty
+        leftCaptures = ((pawns & ~FILE_A) << np.uint64(7)) & enemyOcc
+        rightCaptures = ((pawns & ~FILE_H) << np.uint64(9)) & enemyOcc
+    if stage & CAPTURES:
+        n = emitPawnTargets(bb, leftCaptures & evasions, left, piece, enemyFirst, out, n)
+        n = emitPawnTargets(bb, rightCaptures & evasions, right, piece, enemyFirst, out, n)
+        # en passant is left to the caller's make/undo probe, it removes two pieces from one rank
+        if epSq >= 0:
+            capturers = PAWN_ATTACKS[1 - color, epSq] & pawns
+            while capturers:
+                n = emitMove(out, n, lsbIndex(capturers), epSq, piece, enemyFirst + PAWN)
+                out[n - 1] |= FLAG_ENPASSANT << 12
+                capturers &= capturers - np.uint64(1)
+    if stage & QUIETS:
+        n = emitPawnTargets(bb, singles & evasions, forward, piece, enemyFirst, out, n)
+        n = emitPawnTargets(bb, doubles & evasions, 2 * forward, piece, enemyFirst, out, n)
+    if pinned & bb[piece]:
+        n = genPinnedPawnMoves(bb, color, epSq, allOcc, enemyOcc, stage, kingSq, pinned, evasions, out, n)
+    return n
+
+
+@njit("int64(uint64[:], int64, uint64, uint64, int32[:], int64)", cache=True)
+def genKnightMoves(bb, color, targets, pinned, out, n):
+    # a pinned knight can never stay on its pin line
+    piece = color * 6 + KNIGHT
+    knights = bb[piece] & ~pinned
+    while knights:
+        sq = lsbIndex(knights)
+        knights &= knights - np.uint64(1)
+        n = genTargetMoves(bb, sq, piece, KNIGHT_ATTACKS[sq] & targets, 6 - color * 6, out, n)
+    return n
+
+
+@njit("int64(uint64[:], int64, int64, uint64, uint64, int64, uint64, int32[:], int64)", cache=True)
+def genSliderMoves(bb, color, kind, targets, allOcc, kingSq, pinned, out, n):
+    # bishops, rooks and queens share one routine; a queen looks up both the rook and the bishop lines
+    piece = color * 6 + kind
+    sliders = bb[piece]
+    while sliders:
+        sq = lsbIndex(sliders)
+        sliders &= sliders - np.uint64(1)
+        attacks = np.uint64(0)
+        if kind != ROOK:
+            attacks |= bishopAttacks(sq, allOcc)
+        if kind != BISHOP:
+            attacks |= rookAttacks(sq, allOcc)
+        attacks &= pinMask(sq, kingSq, pinned)
+        n = genTargetMoves(bb, sq, piece, attacks & targets, 6 - color * 6, out, n)
+    return n
+
+
+@njit("int64(uint64[:], int64, uint64, uint64, int32[:], int64)", cache=True)
+def genKingMoves(bb, color, targets, attacked, out, n):
+    # the king may only step onto squares the enemy does not attack, so its moves need no legality probe
+    piece = color * 6 + KING
+    sq = lsbIndex(bb[piece])
+    return genTargetMoves(bb, sq, piece, KING_ATTACKS[sq] & targets & ~attacked, 6 - color * 6, out, n)
+
+
+@njit("int64(uint64[:], int64, int64, uint64, int64, uint64, uint64, uint64, uint64, uint64, int32[:], int64)",
+      cache=True)
+def genStageMoves(bb, color, epSq, attacked, stage, targets, allOcc, enemyOcc, pinned, evasions, out, n):
+    kingSq = lsbIndex(bb[color * 6 + KING])
+    n = genPawnMoves(bb, color, epSq, allOcc, enemyOcc, stage, kingSq, pinned, evasions, out, n)
+    n = genKnightMoves(bb, color, targets & evasions, pinned, out, n)
+    for kind in (BISHOP, ROOK, QUEEN):
+        n = genSliderMoves(bb, color, kind, targets & evasions, allOcc, kingSq, pinned, out, n)
+    return genKingMoves(bb, color, targets, attacked, out, n)
+
+
+@njit("uint64(uint64[:], int64, int64, uint64)", cache=True)
+def attackersOf(bb, sq, byColor, allOcc):
+    first = byColor * 6
+    attackers = PAWN_ATTACKS[1 - byColor, sq] & bb[first + PAWN]
+    attackers |= KNIGHT_ATTACKS[sq] & bb[first + KNIGHT]
+    attackers |= rookAttacks(sq, allOcc) & (bb[first + ROOK] | bb[first + QUEEN])
+    return attackers | (bishopAttacks(sq, allOcc) & (bb[first + BISHOP] | bb[first + QUEEN]))
+
+
+@njit("uint64(uint64[:], int64, uint64)", cache=True)
+def evasionMask(bb, color, allOcc):
+    # the squares a piece other than the king may move to: anywhere out of check, the checker or a
+    # square blocking it in single check, nowhere in double check
+    kingSq = lsbIndex(bb[color * 6 + KING])
+    checkers = attackersOf(bb, kingSq, 1 - color, allOcc)
+    if checkers == 0:
+        return ~np.uint64(0)
+    if checkers & (checkers - np.uint64(1)):
+        return np.uint64(0)
+    checkerSq = lsbIndex(checkers)
+    return BETWEEN[kingSq, checkerSq] | checkers
+
+
+@njit("int64(int64)", cache=True)
+def captureScore(move):
+    return MVV_LVA[(move >> 22 & 15) % 6, (move >> 18 & 15) % 6]
+
+
+@njit("void(int32[:], int64, int64)", cache=True)
+def orderCaptures(out, first, n):
+    # insertion sort by MVV-LVA; a position rarely has more than a handful of captures
+    for i in range(first + 1, n):
+        move = out[i]
+        score = captureScore(move)
+        j = i
+        while j > first and captureScore(out[j - 1]) < score:
+            out[j] = out[j - 1]
+            j -= 1
+        out[j] = move
+
+
+@njit("int64(uint64[:], int64, int64, uint64, int64, uint64, uint64, int32[:])", cache=True)
+def genAllMoves(bb, color, epSq, attacked, stage, ownOcc, enemyOcc, out):
+    # the occupancies come from the ones makeMove keeps up to date instead of being OR-ed together again
+    allOcc = ownOcc | enemyOcc
+    pinned = pinnedPieces(bb, color, ownOcc, allOcc)
+    evasions = evasionMask(bb, color, allOcc)
+    n = 0
+    if stage & CAPTURES:
+        n = genStageMoves(bb, color, epSq, attacked, CAPTURES, enemyOcc, allOcc, enemyOcc, pinned, evasions, out, n)
+        orderCaptures(out, 0, n)
+    if stage & QUIETS:
+        n = genStageMoves(bb, color, epSq, attacked, QUIETS, ~allOcc, allOcc, enemyOcc, pinned, evasions, out, n)
+    return n
+
+
+@njit("uint64(uint64[:], uint64[:], int64)", cache=True)
+def toggleBoards(bb, occ, move):
+    # XOR is its own inverse, so the same toggles make and unmake a move. Returns the matching
+    # change to the pieces' part of the Zobrist key.
+    startSq = move & 63
+    endSq = move >> 6 & 63
+    flags = move >> 12 & 7
+    piece = move >> 18 & 15
+    captured = move >> 22 & 15
+    side = piece // 6
+    moveMask = squareBit(startSq) | squareBit(endSq)
+    bb[piece] ^= moveMask
+    key = ZOB_PIECE[piece, startSq] ^ ZOB_PIECE[piece, endSq]
+    if flags & FLAG_PROMOTION:
+        promoted = piece - PAWN + (move >> 15 & 7)
+        bb[piece] ^= squareBit(endSq)
+        bb[promoted] ^= squareBit(endSq)
+        key ^= ZOB_PIECE[piece, endSq] ^ ZOB_PIECE[promoted, endSq]
+    if captured != NO_PIECE:
+        captureSq = (startSq & ~7) | (endSq & 7) if flags & FLAG_ENPASSANT else endSq
+        bb[captured] ^= squareBit(captureSq)
+        occ[side ^ 1] ^= squareBit(captureSq)
+        key ^= ZOB_PIECE[captured, captureSq]
+    if flags & FLAG_CASTLE:
+        rook = piece - KING + ROOK
+        if endSq > startSq:
+            rookFrom, rookTo = endSq + 1, endSq - 1
+        else:
+            rookFrom, rookTo = endSq - 2, endSq + 1
+        rookMask = squareBit(rookFrom) | squareBit(rookTo)
+        bb[rook] ^= rookMask
+        key ^= ZOB_PIECE[rook, rookFrom] ^ ZOB_PIECE[rook, rookTo]
+        moveMask ^= rookMask
+    occ[side] ^= moveMask
+    return key
+
+
+@njit("uint8[:](uint64[:])", cache=True)
+def pieceCodes(bb):
+    codes = np.zeros(64, dtype=np.uint8)
+    for i in range(12):
+        pieces = bb[i]
+        while pieces:
+            codes[lsbIndex(pieces)] = i + 1
+            pieces &= pieces - np.uint64(1)
+    return codes
+
+
+@njit("uint64(uint64[:], int64, uint64)", cache=True)
+def attackedSquares(bb, byColor, occ):
+    first = byColor * 6
+    attacks = np.uint64(0)
+    pieces = bb[first + PAWN]
+    while pieces:
+        attacks |= PAWN_ATTACKS[byColor, lsbIndex(pieces)]
+        pieces &= pieces - np.uint64(1)
+    pieces = bb[first + KNIGHT]
+    while pieces:
+        attacks |= KNIGHT_ATTACKS[lsbIndex(pieces)]
+        pieces &= pieces - np.uint64(1)
+    pieces = bb[first + BISHOP] | bb[first + QUEEN]
+    while pieces:
+        attacks |= bishopAttacks(lsbIndex(pieces), occ)
+        pieces &= pieces - np.uint64(1)
+    pieces = bb[first + ROOK] | bb[first + QUEEN]
+    while pieces:
+        attacks |= rookAttacks(lsbIndex(pieces), occ)
+        pieces &= pieces - np.uint64(1)
+    return attacks | KING_ATTACKS[lsbIndex(bb[first + KING])]
+
+
+@njit("boolean(uint64[:], int64, int64, uint64)", cache=True)
+def squareAttacked(bb, sq, byColor, allOcc):
+    first = byColor * 6
+    if PAWN_ATTACKS[1 - byColor, sq] & bb[first + PAWN]:
+        return True
+    if KNIGHT_ATTACKS[sq] & bb[first + KNIGHT]:
+        return True
+    if KING_ATTACKS[sq] & bb[first + KING]:
+        return True
+    if rookAttacks(sq, allOcc) & (bb[first + ROOK] | bb[first + QUEEN]):
+        return True
+    return (bishopAttacks(sq, allOcc) & (bb[first + BISHOP] | bb[first + QUEEN])) != 0
+
+
+@njit("float64(uint64[:], int64[:], float64[:, :])", cache=True)
+def scorePieces(bb, material, positions):
+    # one pass over each bitboard adds every piece's material and position score together
+    score = 0.0
+    for i in range(12):
+        pieces = bb[i]
+        while pieces:
+            score += material[i] + positions[i, lsbIndex(pieces)] * .1
+            pieces &= pieces - np.uint64(1)
+    return score
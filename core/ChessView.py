@@ -15,6 +15,11 @@ class ChessView:
         self.SQUARE_SIZE = self.HEIGHT // self.n
         self.FPS = 15
         self.IMAGES = {}
+        # the squares never move, so their rects and colours are built once instead of every frame
+        self.SQUARE_RECTS = [p.Rect(col * self.SQUARE_SIZE, row * self.SQUARE_SIZE, self.SQUARE_SIZE, self.SQUARE_SIZE)
+                             for row in range(self.n) for col in range(self.n)]
+        colors = [p.Color(235, 235, 208), p.Color(119, 148, 85)]
+        self.SQUARE_COLORS = [colors[(row + col) % 2] for row in range(self.n) for col in range(self.n)]
         self.screen = p.display.set_mode((self.WIDTH, self.HEIGHT))
         self.click = False
         self.buttons = {"buttonAIvsAI": p.Rect(56, 120, 400, 56),
@@ -37,26 +42,21 @@ class ChessView:
     def loadBoard(self):
         pieces = ['wP', 'wR', 'wN', 'wB', 'wK', 'wQ', 'bP', 'bR', 'bN', 'bB', 'bK', 'bQ']
         for piece in pieces:
+            # converted to the display format once, so blits don't convert pixels every frame
             self.IMAGES[piece] = p.transform.scale(p.image.load("../images/" + piece + ".png"),
-                                                   (self.SQUARE_SIZE, self.SQUARE_SIZE))
+                                                   (self.SQUARE_SIZE, self.SQUARE_SIZE)).convert_alpha()
+        # the empty board is static, so it is drawn once here and copied to the screen with one blit per frame
+        self.BOARD = p.Surface((self.WIDTH, self.HEIGHT)).convert()
+        for rect, color in zip(self.SQUARE_RECTS, self.SQUARE_COLORS):
+            p.draw.rect(self.BOARD, color, rect)
 
     def drawBoard(self):
-        global colors
-        colors = [p.Color(235, 235, 208), p.Color(119, 148, 85)]
-        for i in range(self.n):
-            for j in range(self.n):
-                color = colors[((i + j) % 2)]
-                p.draw.rect(self.screen, color,
-                            p.Rect(j * self.SQUARE_SIZE, i * self.SQUARE_SIZE, self.SQUARE_SIZE, self.SQUARE_SIZE))
+        self.screen.blit(self.BOARD, (0, 0))
 
     def drawPieces(self, board):
-        for i in range(self.n):
-            for j in range(self.n):
-                piece = board[i][j]
-                if piece != "--":
-                    self.screen.blit(self.IMAGES[piece],
-                                     p.Rect(j * self.SQUARE_SIZE, i * self.SQUARE_SIZE, self.SQUARE_SIZE,
-                                            self.SQUARE_SIZE))
+        # one batched blit call for every piece on the board
+        self.screen.blits([(self.IMAGES[piece], rect) for piece, rect in zip(board.flat, self.SQUARE_RECTS)
+                           if piece != "--"], False)
 
     def drawText(self, text):
         font = p.font.SysFont("couriernew", 22, True, False)
@@ -0,0 +1,56 @@
+import unittest
+from unittest import mock
+
+from core import ChessEngine
+from tests.test_perft import gameStateFromFEN
+
+
+def play(gs, *names):
+    for name in names:
+        startSq = ChessEngine.squareIndex(name[:2])
+        endSq = ChessEngine.squareIndex(name[2:])
+        gs.makeMove(next(move for move in gs.getValidMoves() if move & 63 == startSq and move >> 6 & 63 == endSq))
+
+
+class MoveCacheTest(unittest.TestCase):
+    def test_transposition_hits_the_cache(self):
+        gs = ChessEngine.GameState()
+        play(gs, "e2e3", "e7e6", "d2d3")
+        moves = list(gs.getValidMoves())
+        key = gs.key
+        for _ in range(3):
+            gs.undoMove()
+        play(gs, "d2d3", "e7e6", "e2e3")
+        self.assertEqual(gs.key, key)
+        with mock.patch.object(gs, "generateValidMoves", side_effect=AssertionError("cache miss")):
+            self.assertEqual(gs.getValidMoves(), moves)
+
+    def assertRegenerated(self, gs, oldKey):
+        # the same pieces under a different key must not be served the stored moves
+        self.assertNotEqual(gs.key, oldKey)
+        with mock.patch.object(gs, "generateValidMoves", wraps=gs.generateValidMoves) as generate:
+            moves = gs.getValidMoves()
+        generate.assert_called_once()
+        return moves
+
+    def test_castle_rights_change_the_key(self):
+        gs = gameStateFromFEN("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+        self.assertTrue(any(move >> 12 & ChessEngine.FLAG_CASTLE for move in gs.getValidMoves()))
+        oldKey = gs.key
+        gs.castleRights = 0
+        gs.key = gs.zobristKey()
+        moves = self.assertRegenerated(gs, oldKey)
+        self.assertFalse(any(move >> 12 & ChessEngine.FLAG_CASTLE for move in moves))
+
+    def test_en_passant_square_changes_the_key(self):
+        gs = gameStateFromFEN("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1")
+        self.assertTrue(any(move >> 12 & ChessEngine.FLAG_ENPASSANT for move in gs.getValidMoves()))
+        oldKey = gs.key
+        gs.enpassantPossible = ()
+        gs.key = gs.zobristKey()
+        moves = self.assertRegenerated(gs, oldKey)
+        self.assertFalse(any(move >> 12 & ChessEngine.FLAG_ENPASSANT for move in moves))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+from core import ChessEngine
+from core.ChessKernels import ALL, CAPTURES, PIECE_VALUES, QUIETS
+from tests.test_perft import gameStateFromFEN
+
+KIWIPETE = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+
+def isCapture(move):
+    return move >> 22 & 15 != ChessEngine.NO_PIECE
+
+
+class MoveOrderTest(unittest.TestCase):
+    def test_captures_first_by_mvv_lva(self):
+        moves = list(gameStateFromFEN(KIWIPETE).generateValidMoves())
+        captures = [move for move in moves if isCapture(move)]
+        self.assertGreater(len(captures), 5)
+        self.assertEqual(moves[:len(captures)], captures)
+        # most valuable victim first, then least valuable attacker
+        order = [(-PIECE_VALUES[(move >> 22 & 15) % 6], PIECE_VALUES[(move >> 18 & 15) % 6]) for move in captures]
+        self.assertEqual(order, sorted(order))
+
+    def test_stages_split_all_moves(self):
+        gs = gameStateFromFEN(KIWIPETE)
+        captures = list(gs.generateValidMoves(CAPTURES))
+        quiets = list(gs.generateValidMoves(QUIETS))
+        allMoves = list(gs.generateValidMoves(ALL))
+        self.assertEqual(allMoves, captures + quiets)
+        self.assertTrue(all(isCapture(move) for move in captures))
+        self.assertFalse(any(isCapture(move) for move in quiets))
+        # both castles are quiet moves
+        self.assertEqual(sum(move >> 12 & ChessEngine.FLAG_CASTLE != 0 for move in quiets), 2)
+
+    def test_captures_stage_drops_illegal_en_passant(self):
+        # exd6 e.p. would leave the white king on a5 in check from the rook on h5
+        gs = gameStateFromFEN("8/8/8/K2pP2r/8/8/8/7k w - d6 0 1")
+        self.assertTrue(any(move >> 12 & ChessEngine.FLAG_ENPASSANT for move in gs.getAllPossibleMoves(CAPTURES)))
+        self.assertFalse(any(move >> 12 & ChessEngine.FLAG_ENPASSANT for move in gs.generateValidMoves(CAPTURES)))
+
+
+if __name__ == "__main__":
+    unittest.main()
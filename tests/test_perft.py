@@ -0,0 +1,81 @@
+import os
+import unittest
+
+# no sound card is needed to run the tests
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame as p
+
+from core import ChessEngine
+
+# the engine plays a sound when it finds a mate, so the mixer has to be up even without a window
+p.mixer.init()
+
+# reference positions and node counts from the chess programming wiki's perft results page
+PERFT_POSITIONS = [
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", 4, 197281),
+    ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", 3, 97862),
+    ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", 4, 43238),
+    ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", 3, 9467),
+    ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", 3, 62379),
+    ("r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10", 3, 89890),
+]
+
+
+def gameStateFromFEN(fen):
+    placement, side, castling, enpassant = fen.split()[:4]
+    gs = ChessEngine.GameState()
+    bb = [0] * 12
+    for row, rank in enumerate(placement.split("/")):
+        col = 0
+        for ch in rank:
+            if ch.isdigit():
+                col += int(ch)
+                continue
+            name = ("w" if ch.isupper() else "b") + ch.upper()
+            bb[ChessEngine.PIECE_INDEX[name]] |= 1 << (row * 8 + col)
+            if name == "wK":
+                gs.whiteKingLocation = (row, col)
+            elif name == "bK":
+                gs.blackKingLocation = (row, col)
+            col += 1
+    gs.bb = np.array(bb, dtype=np.uint64)
+    gs.occ = np.array([sum(bb[:6]), sum(bb[6:])], dtype=np.uint64)
+    gs.whiteMoves = side == "w"
+    gs.castleRights = sum(right for ch, right in (("K", ChessEngine.CASTLE_WK), ("Q", ChessEngine.CASTLE_WQ),
+                                                  ("k", ChessEngine.CASTLE_BK), ("q", ChessEngine.CASTLE_BQ))
+                          if ch in castling)
+    gs.enpassantPossible = () if enpassant == "-" else divmod(ChessEngine.squareIndex(enpassant), 8)
+    gs.key = gs.zobristKey()
+    return gs
+
+
+def perft(gs, depth):
+    moves = gs.getValidMoves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    # moves is the ply's reused list, deeper plies fill their own
+    for move in moves:
+        gs.makeMove(move)
+        nodes += perft(gs, depth - 1)
+        gs.undoMove()
+    return nodes
+
+
+class PerftTest(unittest.TestCase):
+    def test_reference_positions(self):
+        for fen, depth, nodes in PERFT_POSITIONS:
+            with self.subTest(fen=fen):
+                gs = gameStateFromFEN(fen)
+                key = gs.key
+                self.assertEqual(perft(gs, depth), nodes)
+                # make/undo must leave the position exactly as it was
+                self.assertEqual(gs.ply, 0)
+                self.assertEqual(gs.key, key)
+                self.assertEqual(gs.zobristKey(), key)
+
+
+if __name__ == "__main__":
+    unittest.main()